@@ -1,16 +1,43 @@
+import functools
+import logging
 import re
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from natsort import natsorted
 import openpyxl
 from openpyxl.utils import get_column_letter
 import argparse
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill
-from typing import Dict, List, Tuple, Union, Optional, Any
-from excel_reader import read_aion_fx_xlsx_file
+from typing import Dict, List, Tuple, Optional, Any
+from excel_reader import AION_COLUMNS, iter_aion_fx_sheets
+
+logger = logging.getLogger(__name__)
 
 EXCLUDED_KEYWORDS: List[str] = ["ic socket", "enclosure", "dust cover"]
 
+# Capacitor categories the inventory sheet tracks
+_VALID_CAP_TYPES = frozenset({"ceramic", "film", "electrolytic"})
+
+PINK_FILL = PatternFill(start_color="ffc0cb", end_color="ffc0cb", fill_type="solid")   # missing
+ORANGE_FILL = PatternFill(start_color="ffd8a8", end_color="ffd8a8", fill_type="solid") # few
+
+_EXCLUDED_RE = re.compile("|".join(map(re.escape, EXCLUDED_KEYWORDS)), re.IGNORECASE)
+_IC_PART_RE = re.compile(r'^IC\d+$', re.IGNORECASE)
+_JNUM_RE = re.compile(r'^J\d+$', re.IGNORECASE)
+_EURO_DECODE_RE = re.compile(r'^(\d+)([RrKkMmNnUuPp])(\d+)$')
+_EURO_ALREADY_RE = re.compile(r'^\d+[pnu]\d*$')
+_EURO_CAP_RE = re.compile(r'([\d.]+)([pnu])')
+_F_SUFFIX_RE = re.compile(r'f$')
+_CAP_VALUE_RE = re.compile(r'([\d.]+)([pnu])f?')
+_CAP_TYPE_RE = re.compile(r'electrolytic|tantalum|ceramic|mlcc|film')
+_POT_RE = re.compile(r'\bpot\b')
+_SWITCH_RE = re.compile(r'\bswitch\b')
+_RES_NUM_RE = re.compile(r'^([\d.]+)([MKR]?)$')
+_CAP_NUM_RE = re.compile(r'^([\d.]+)([pnu])')
+_PART_PREFIX_RE = re.compile(r'^([A-Za-z]+)')
+_PART_NUM_RE = re.compile(r'(\d+)$')
+
 SORT_ORDER: Dict[str, int] = {
     "Resistor": 0,
     "Capacitor": 1,
@@ -23,17 +50,21 @@ SORT_ORDER: Dict[str, int] = {
     "Other": 8,
 }
 
+@functools.lru_cache(maxsize=4096)
 def decode_euro_decimal(val: str) -> str:
     """
     Converts resistor and capacitor values like 2K2 or 6n8 to 2.2K or 6.8n
+
+    BOMs repeat the same handful of values many times, so results are memoized.
     """
     if not isinstance(val, str):
         return val
-    match = re.match(r'^(\d+)([RrKkMmNnUuPp])(\d+)$', val.replace(" ", ""))
+    match = _EURO_DECODE_RE.match(val.replace(" ", ""))
     if match:
         return f"{match.group(1)}.{match.group(3)}{match.group(2)}".lower()
     return val.lower().strip()
 
+@functools.lru_cache(maxsize=4096)
 def convert_to_euro_notation(val: str) -> str:
     """
     Converts capacitor values to Euro-style notation to match inventory format.
@@ -46,14 +77,14 @@ def convert_to_euro_notation(val: str) -> str:
     val = val.strip().lower()
     
     # Remove 'f' suffix if present
-    val = re.sub(r'f$', '', val)
-    
+    val = _F_SUFFIX_RE.sub('', val)
+
     # If already in Euro-style notation, return as is
-    if re.match(r'^\d+[pnu]\d*$', val):
+    if _EURO_ALREADY_RE.match(val):
         return val
-    
+
     # Extract numeric value and unit
-    match = re.match(r'([\d.]+)([pnu])', val)
+    match = _EURO_CAP_RE.match(val)
     if match:
         num = float(match.group(1))
         unit = match.group(2)
@@ -71,7 +102,57 @@ def convert_to_euro_notation(val: str) -> str:
     # If no unit found, return as is
     return val
 
+_RESISTOR_SCALE = {"R": 1.0, "K": 1e3, "M": 1e6}
+_CAP_UNIT_ORDER = {'p': 0, 'n': 1, 'u': 2}
+
+def _scan_value(val: str) -> Tuple[float, str]:
+    """
+    Regex-free scanner for component values: returns (number, unit_char)
+    with unit_char '' when no unit is present.
+
+    Handles both plain notation (2.2K, 100n, 47pf) and Euro notation
+    (2K2, 6n8), where digits after the unit are the decimal tail.
+    Raises ValueError for anything it cannot parse cleanly.
+    """
+    s = val.replace(" ", "").strip()
+    n = len(s)
+    i = 0
+    while i < n and (s[i].isdigit() or s[i] == "."):
+        i += 1
+    if i == 0:
+        raise ValueError(f"Unparseable component value: {val!r}")
+    number = float(s[:i])
+
+    unit = ""
+    if i < n:
+        unit = s[i]
+        if unit.upper() not in "RKMNUP":
+            raise ValueError(f"Unparseable component value: {val!r}")
+        i += 1
+        tail_start = i
+        while i < n and s[i].isdigit():
+            i += 1
+        if i > tail_start:
+            tail = s[tail_start:i]
+            number += int(tail) / (10 ** len(tail))
+        if s[i:].lower() == "f":  # tolerate 47pf / 100nF
+            i = n
+        if i < n:
+            raise ValueError(f"Unparseable component value: {val!r}")
+
+    return number, unit
+
+@functools.lru_cache(maxsize=4096)
 def parse_resistor_value(value_str: str) -> float:
+    try:
+        number, unit = _scan_value(str(value_str))
+        if not unit:
+            return number
+        scale = _RESISTOR_SCALE.get(unit.upper())
+        return number * scale if scale is not None else float('inf')
+    except ValueError:
+        pass
+    # Fallback string path for inputs the scanner rejects
     try:
         value_str = decode_euro_decimal(value_str).upper()
         if "M" in value_str:
@@ -85,19 +166,28 @@ def parse_resistor_value(value_str: str) -> float:
     except:
         return float('inf')
 
+@functools.lru_cache(maxsize=4096)
 def parse_capacitor_value(value_str: str) -> Tuple[int, float]:
     """
     Returns a tuple: (unit_rank, numeric_value)
     Where unit_rank is an int representing: pF=0, nF=1, uF=2
     """
-    unit_order = {'p': 0, 'n': 1, 'u': 2}
+    try:
+        number, unit = _scan_value(str(value_str))
+        if not unit:
+            return (99, number)
+        return (_CAP_UNIT_ORDER.get(unit.lower(), 99),
+                number if unit.lower() in _CAP_UNIT_ORDER else float('inf'))
+    except ValueError:
+        pass
+    # Fallback regex path for inputs the scanner rejects
     try:
         val = decode_euro_decimal(value_str).lower().replace(" ", "")
-        match = re.match(r'([\d.]+)([pnu])f?', val)
+        match = _CAP_VALUE_RE.match(val)
         if match:
             num = float(match.group(1))
             unit = match.group(2)
-            return (unit_order.get(unit, 99), num)
+            return (_CAP_UNIT_ORDER.get(unit, 99), num)
         else:
             return (99, float(val))  # fallback: numeric only
     except:
@@ -114,11 +204,11 @@ def get_type(description: str, value: Optional[str] = None, part: Optional[str]
         return "Diode"
     
     # Check for IC part numbers (IC followed by digits)
-    if part and isinstance(part, str) and re.match(r'^IC\d+$', part.strip(), re.IGNORECASE):
+    if part and isinstance(part, str) and _IC_PART_RE.match(part.strip()):
         return "IC"
-    
+
     # Check for J-number transistors in value field
-    if value and isinstance(value, str) and re.match(r'^J\d+$', value.strip(), re.IGNORECASE):
+    if value and isinstance(value, str) and _JNUM_RE.match(value.strip()):
         return "Transistor"
     
     if "resistor" in d:
@@ -131,88 +221,192 @@ def get_type(description: str, value: Optional[str] = None, part: Optional[str]
         return "Transistor"
     elif "ic" in d or "opamp" in d or "operational amplifier" in d:
         return "IC"
-    elif re.search(r'\bpot\b', d) or "trimmer" in d:
+    elif _POT_RE.search(d) or "trimmer" in d:
         return "Potentiometer"
-    elif re.search(r'\bswitch\b', d):
+    elif _SWITCH_RE.search(d):
         return "Switch"
     elif "jack" in d or "connector" in d:
         return "Connector"
     else:
         return "Other"
 
+def _as_type_categorical(types: pd.Series) -> pd.Categorical:
+    """
+    Store the small-cardinality Type column as an ordered categorical so
+    sorts and groupbys work on integer codes instead of hashing strings.
+    """
+    return pd.Categorical(types, categories=list(SORT_ORDER), ordered=True)
+
+def get_types(df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized version of get_type for a whole BOM DataFrame.
+
+    Applies the same checks in the same priority order, but as column-wide
+    pandas string operations instead of one Python call per row.
+    """
+    d = df["Description"].fillna("").astype(str).str.lower()
+
+    if "Part" in df.columns:
+        ic_part = df["Part"].fillna("").astype(str).str.strip().str.match(_IC_PART_RE)
+    else:
+        ic_part = pd.Series(False, index=df.index)
+    jnum = df["Value"].fillna("").astype(str).str.strip().str.match(_JNUM_RE)
+
+    led = d.str.contains("led", regex=False)
+    resistor = d.str.contains("resistor", regex=False)
+    capacitor = d.str.contains("capacitor", regex=False)
+    diode = d.str.contains("diode", regex=False)
+    transistor = d.str.contains("transistor", regex=False)
+    ic_desc = (
+        d.str.contains("ic", regex=False)
+        | d.str.contains("opamp", regex=False)
+        | d.str.contains("operational amplifier", regex=False)
+    )
+    pot = d.str.contains(_POT_RE) | d.str.contains("trimmer", regex=False)
+    switch = d.str.contains(_SWITCH_RE)
+    connector = d.str.contains("jack", regex=False) | d.str.contains("connector", regex=False)
+
+    types = np.select(
+        [led, ic_part, jnum, resistor, capacitor, diode, transistor, ic_desc, pot, switch, connector],
+        ["Diode", "IC", "Transistor", "Resistor", "Capacitor", "Diode", "Transistor", "IC",
+         "Potentiometer", "Switch", "Connector"],
+        default="Other",
+    )
+    # get_type treats any non-string description (missing or e.g. a numeric
+    # cell) as "Other" regardless of Part/Value
+    is_str = df["Description"].map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    types = np.where(is_str, types, "Other")
+    return pd.Series(types, index=df.index)
+
 def description_is_excluded(desc: str) -> bool:
     if not isinstance(desc, str):
         return False
     desc = desc.lower()
     return any(term in desc for term in EXCLUDED_KEYWORDS)
 
-def sort_bom(df: pd.DataFrame) -> pd.DataFrame:
-    # Check if Part column exists, otherwise use None
-    if "Part" in df.columns:
-        df["Type"] = df.apply(lambda row: get_type(row["Description"], row["Value"], row["Part"]), axis=1)
-    else:
-        df["Type"] = df.apply(lambda row: get_type(row["Description"], row["Value"], None), axis=1)
-
-    def sort_key(row: pd.Series) -> Tuple[int, Union[float, Tuple[int, float], str]]:
-        typ = row["Type"]
-        order = SORT_ORDER.get(typ, 99)
-        val = row["Value"]
-        if typ == "Resistor":
-            parsed_val = parse_resistor_value(val)
-        elif typ == "Capacitor":
-            parsed_val = parse_capacitor_value(val)
-        else:
-            parsed_val = str(val).lower()
-        return (order, parsed_val)
+def _parse_resistor_values(values: pd.Series) -> pd.Series:
+    """
+    Vectorized parse_resistor_value: Series of resistor value strings -> ohms.
+    Unparseable values map to inf so they sort last, matching the scalar version.
+    """
+    s = values.astype(str).str.replace(" ", "", regex=False)
+    # Decode Euro decimals like 2K2 -> 2.2K
+    euro = s.str.extract(_EURO_DECODE_RE)
+    s = pd.Series(np.where(euro[0].notna(), euro[0] + "." + euro[2] + euro[1], s),
+                  index=values.index).str.upper()
+    m = s.str.extract(_RES_NUM_RE)
+    num = pd.to_numeric(m[0], errors="coerce")
+    mult = m[1].map({"M": 1e6, "K": 1e3, "R": 1.0, "": 1.0})
+    return (num * mult).fillna(np.inf)
+
+def _parse_capacitor_values(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Vectorized parse_capacitor_value: returns (unit_rank, numeric_value) Series
+    where unit_rank is pF=0, nF=1, uF=2 (99 for no recognized unit).
+    """
+    s = values.astype(str).str.replace(" ", "", regex=False)
+    euro = s.str.extract(_EURO_DECODE_RE)
+    s = pd.Series(np.where(euro[0].notna(), euro[0] + "." + euro[2] + euro[1], s),
+                  index=values.index).str.lower()
+    m = s.str.extract(_CAP_NUM_RE)
+    rank = m[1].map({'p': 0, 'n': 1, 'u': 2})
+    num = pd.to_numeric(m[0], errors="coerce")
+    # Fallback for values without a recognized unit: numeric only, else inf
+    no_unit = rank.isna()
+    rank = rank.fillna(99).astype("int16")
+    num = num.where(~no_unit, pd.to_numeric(s, errors="coerce")).fillna(np.inf)
+    return rank, num
+
+def _sort_by_type_and_value(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sort a BOM by component type order, then by parsed component value.
+
+    Builds flat numeric sort columns instead of a per-row tuple key so the
+    whole sort stays inside pandas.
+    """
+    order = df["Type"].map(SORT_ORDER).fillna(99).astype("int8")
+    unit_rank = pd.Series(0, index=df.index, dtype="int16")
+    num_val = pd.Series(np.nan, index=df.index, dtype="float64")
+    fallback = pd.Series("", index=df.index, dtype=object)
+
+    is_resistor = df["Type"].eq("Resistor")
+    if is_resistor.any():
+        num_val.loc[is_resistor] = _parse_resistor_values(df.loc[is_resistor, "Value"])
+
+    is_capacitor = df["Type"].eq("Capacitor")
+    if is_capacitor.any():
+        rank, num = _parse_capacitor_values(df.loc[is_capacitor, "Value"])
+        unit_rank.loc[is_capacitor] = rank
+        num_val.loc[is_capacitor] = num
 
-    df["SortKey"] = df.apply(sort_key, axis=1)
-    df = df.sort_values(by="SortKey")
-    df = df.drop(columns=["SortKey"])
-    return df
+    other = ~(is_resistor | is_capacitor)
+    if other.any():
+        fallback.loc[other] = df.loc[other, "Value"].astype(str).str.lower()
+
+    df = df.assign(_Order=order, _UnitRank=unit_rank, _NumVal=num_val, _Fallback=fallback)
+    df = df.sort_values(by=["_Order", "_UnitRank", "_NumVal", "_Fallback"], kind="mergesort")
+    return df.drop(columns=["_Order", "_UnitRank", "_NumVal", "_Fallback"])
+
+def sort_bom(df: pd.DataFrame) -> pd.DataFrame:
+    df["Type"] = _as_type_categorical(get_types(df))
+    return _sort_by_type_and_value(df)
 
 def sort_combined_bom(df: pd.DataFrame) -> pd.DataFrame:
     """
     Sort combined BOM without recalculating Type (since it already exists)
     """
-    def sort_key(row: pd.Series) -> Tuple[int, Union[float, Tuple[int, float], str]]:
-        typ = row["Type"]
-        order = SORT_ORDER.get(typ, 99)
-        val = row["Value"]
-        if typ == "Resistor":
-            parsed_val = parse_resistor_value(val)
-        elif typ == "Capacitor":
-            parsed_val = parse_capacitor_value(val)
-        else:
-            parsed_val = str(val).lower()
-        return (order, parsed_val)
+    return _sort_by_type_and_value(df)
 
-    df["SortKey"] = df.apply(sort_key, axis=1)
-    df = df.sort_values(by="SortKey")
-    df = df.drop(columns=["SortKey"])
-    return df
+def _relevant_bom_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drop excluded descriptions and rows with missing or invalid essential
+    data in one boolean reduction instead of three successive filters.
+    """
+    desc = df["Description"].fillna("").astype(str)
+    value = df["Value"].fillna("").astype(str)
+    keep = (
+        ~desc.str.contains(_EXCLUDED_RE)
+        & df["Description"].notna()
+        & df["Value"].notna()
+        & desc.str.strip().ne("")
+        & value.str.strip().ne("")
+    )
+    return df.loc[keep]
 
 def process_bom_file(file_path: str) -> pd.DataFrame:
-    combined_df = read_aion_fx_xlsx_file(file_path)
-
-    # Filter out excluded descriptions
-    combined_df = combined_df[~combined_df["Description"].apply(description_is_excluded)]
-    
-    # Filter out rows with missing or invalid essential data
-    combined_df = combined_df.dropna(subset=["Description", "Value"])
-    combined_df = combined_df[combined_df["Description"].str.strip() != ""]
-    combined_df = combined_df[combined_df["Value"].str.strip() != ""]
+    # Stream one sheet at a time and filter each batch as it arrives, so
+    # peak memory is bounded by the rows that survive filtering rather than
+    # every row of every sheet
+    frames = [_relevant_bom_rows(sheet_df) for sheet_df in iter_aion_fx_sheets(file_path)]
+    frames = [f for f in frames if not f.empty]
+    if frames:
+        combined_df = pd.concat(frames, ignore_index=True)
+    else:
+        combined_df = pd.DataFrame(columns=AION_COLUMNS)
 
     combined_df["Part"] = combined_df["Part"].astype(str)
     combined_df["Notes"] = combined_df["Notes"].fillna("").str.strip()
     
     # Calculate Type BEFORE grouping
-    combined_df["Type"] = combined_df.apply(lambda row: get_type(row["Description"], row["Value"], row["Part"]), axis=1)
-
-    # Group by Value + Description + Notes + Type
+    combined_df["Type"] = _as_type_categorical(get_types(combined_df))
+
+    # Sort once by a vectorized natural key (alpha prefix, numeric suffix) so
+    # each group's parts arrive in natural order, instead of natsorting every
+    # group separately inside the aggregation
+    combined_df["_prefix"] = combined_df["Part"].str.extract(_PART_PREFIX_RE, expand=False).fillna("")
+    combined_df["_num"] = pd.to_numeric(
+        combined_df["Part"].str.extract(_PART_NUM_RE, expand=False), errors="coerce"
+    ).fillna(0).astype(int)
+    combined_df = combined_df.sort_values(["_prefix", "_num"], kind="mergesort")
+
+    # Group by Value + Description + Notes + Type; observed=True keeps the
+    # categorical Type from expanding to unobserved category combinations
     grouped = (
-        combined_df.groupby(["Value", "Description", "Notes", "Type"], dropna=False)
+        combined_df.groupby(["Value", "Description", "Notes", "Type"], dropna=False,
+                            observed=True, sort=False)
         .agg({
-            "Part": lambda x: ", ".join(natsorted(set(x.dropna()))),
+            # dict.fromkeys dedupes while keeping the presorted order
+            "Part": lambda x: ", ".join(dict.fromkeys(x.dropna())),
         })
         .reset_index()
     )
@@ -238,23 +432,21 @@ def count_parts_in_row(part_str: str) -> int:
     parts = [p.strip() for p in str(part_str).split(",") if p.strip()]
     return len(parts)
 
-def autofit_column_widths(ws: openpyxl.worksheet.worksheet.Worksheet) -> None:
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column  # Get the column index (1-based)
-        for cell in col:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
-        adjusted_width = max_length + 2
-        ws.column_dimensions[get_column_letter(column)].width = adjusted_width
-
-def load_resistor_inventory_from_xlsx(filepath: str) -> Dict[str, str]:
-    df = pd.read_excel(filepath, sheet_name="TH Resistors", usecols=[0, 1], header=None)
+def autofit_column_widths(ws: openpyxl.worksheet.worksheet.Worksheet, df: pd.DataFrame) -> None:
+    """
+    Size worksheet columns from the source DataFrame with one vectorized
+    length reduction per column, instead of re-scanning every written cell.
+    """
+    for idx, col in enumerate(df.columns, start=1):
+        content_len = int(df[col].astype(str).str.len().max()) if len(df) else 0
+        width = max(content_len, len(str(col))) + 2
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+def load_resistor_inventory_from_xlsx(xl: pd.ExcelFile) -> Dict[str, str]:
+    df = xl.parse("TH Resistors", usecols=[0, 1], header=None)
     inventory = {}
-    for _, row in df.iterrows():
+    # itertuples yields plain tuples instead of allocating a Series per row
+    for row in df.itertuples(index=False, name=None):
         val = str(row[0]).strip().lower()
         if not val:
             continue
@@ -276,151 +468,201 @@ def interpret_inventory_amount(raw: Any) -> str:
     except ValueError:
         return "ok"  # non-numeric = assume available
 
-def load_capacitor_inventory_from_xlsx(filepath: str) -> Dict[str, Dict[str, Optional[str]]]:
-    df = pd.read_excel(filepath, sheet_name="TH Capacitors", header=0)
+def load_capacitor_inventory_from_xlsx(xl: pd.ExcelFile) -> Dict[Tuple[str, str], Optional[str]]:
+    """
+    Returns a flat dict keyed by (cap_type, value) so lookups cost a single
+    hash instead of two nested dict indirections.
+    """
+    df = xl.parse("TH Capacitors", header=0)
+
+    inventory: Dict[Tuple[str, str], Optional[str]] = {}
 
-    inventory = {
-        "ceramic": {},
-        "film": {},
-        "electrolytic": {},
-    }
+    for row in df.itertuples(index=False, name=None):
+        ncols = len(row)
 
-    for _, row in df.iterrows():
         # Ceramic: columns 0 and 1
-        val = str(row.iloc[0]).strip() if pd.notna(row.iloc[0]) else ""
+        val = str(row[0]).strip() if pd.notna(row[0]) else ""
         if val:
             key = val.lower()  # Keep Euro-style notation like "10p", "22p"
-            status = interpret_inventory_amount(row.iloc[1]) if len(row) > 1 else None
-            inventory["ceramic"][key] = status
+            status = interpret_inventory_amount(row[1]) if ncols > 1 else None
+            inventory[("ceramic", key)] = status
 
         # Film: columns 3 and 4
-        val = str(row.iloc[3]).strip() if len(row) > 3 and pd.notna(row.iloc[3]) else ""
+        val = str(row[3]).strip() if ncols > 3 and pd.notna(row[3]) else ""
         if val:
             key = val.lower()  # Keep Euro-style notation like "1n", "1n5", "2n2"
-            status = interpret_inventory_amount(row.iloc[4]) if len(row) > 4 else None
-            inventory["film"][key] = status
+            status = interpret_inventory_amount(row[4]) if ncols > 4 else None
+            inventory[("film", key)] = status
 
         # Electrolytic: columns 5 and 6
-        val = str(row.iloc[5]).strip() if len(row) > 5 and pd.notna(row.iloc[5]) else ""
+        val = str(row[5]).strip() if ncols > 5 and pd.notna(row[5]) else ""
         if val:
             key = val.lower()  # Keep Euro-style notation
-            status = interpret_inventory_amount(row.iloc[6]) if len(row) > 6 else None
-            inventory["electrolytic"][key] = status
+            status = interpret_inventory_amount(row[6]) if ncols > 6 else None
+            inventory[("electrolytic", key)] = status
 
-    print("\n🔍 Debug: Capacitor inventory loaded:")
-    for cap_type in ["ceramic", "film", "electrolytic"]:
-        print(f"  {cap_type}: {len(inventory[cap_type])} items")
-        for key, status in sorted(inventory[cap_type].items()):  # Show all items
-            print(f"    '{key}' -> {status}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("🔍 Capacitor inventory loaded:")
+        for cap_type in ["ceramic", "film", "electrolytic"]:
+            items = sorted((key, status) for (typ, key), status in inventory.items() if typ == cap_type)
+            logger.debug("  %s: %d items", cap_type, len(items))
+            for key, status in items:  # Show all items
+                logger.debug("    '%s' -> %s", key, status)
 
     return inventory
 
-def highlight_missing_parts(ws: openpyxl.worksheet.worksheet.Worksheet, resistor_inv: Dict[str, str], capacitor_inv: Dict[str, Dict[str, Optional[str]]]) -> None:
-    pink_fill = PatternFill(start_color="ffc0cb", end_color="ffc0cb", fill_type="solid")   # missing
-    orange_fill = PatternFill(start_color="ffd8a8", end_color="ffd8a8", fill_type="solid") # few
-
-    for row in range(2, ws.max_row + 1):
-        value = str(ws.cell(row=row, column=3).value).strip().lower()
-        desc = str(ws.cell(row=row, column=4).value or "").lower()
+@functools.lru_cache(maxsize=1024)
+def _classify_cap_type(desc: str) -> str:
+    """
+    Classify a (lowercased) capacitor description into an inventory category.
 
-        highlight = None
+    One regex scan instead of five substring tests; memoized because the
+    combined BOM repeats the same few descriptions.
+    """
+    found = set(_CAP_TYPE_RE.findall(desc))
+    if "electrolytic" in found:
+        return "electrolytic"
+    if "ceramic" in found or "mlcc" in found:
+        return "ceramic"
+    if "film" in found:
+        return "film"
+    if "tantalum" in found:
+        return "electrolytic"  # Treat tantalum as electrolytic for inventory purposes
+    return "other"
+
+def get_missing_part_fill(raw_value: Any, raw_desc: Any, resistor_inv: Dict[str, str], capacitor_inv: Dict[Tuple[str, str], Optional[str]]) -> Optional[PatternFill]:
+    """
+    Return the fill marking a combined-BOM row as missing (pink) or low
+    stock (orange), or None if the part is available / not tracked.
+    """
+    value = str(raw_value).strip().lower()
+    desc = str(raw_desc or "").lower()
+
+    if "resistor" in desc:
+        status = resistor_inv.get(value)
+        if status is None:
+            return PINK_FILL
+        if status == "few":
+            return ORANGE_FILL
+
+    elif "capacitor" in desc:
+        desc_clean = desc.strip().lower()
+        cap_type = _classify_cap_type(desc_clean)
+
+        if cap_type in _VALID_CAP_TYPES:
+            # Convert BOM value to Euro-style notation to match inventory
+            cap_value = convert_to_euro_notation(value.strip().lower())
+            status = capacitor_inv.get((cap_type, cap_value))
+            logger.debug("🔎 Checking %s capacitor '%s' (from '%s') ... status: %s", cap_type, cap_value, value, status)
 
-        if "resistor" in desc:
-            status = resistor_inv.get(value)
             if status is None:
-                highlight = pink_fill
+                logger.debug("    -> Marking as missing (status is None)")
+                return PINK_FILL
             elif status == "few":
-                highlight = orange_fill
-
-        elif "capacitor" in desc:
-            desc_clean = desc.strip().lower()
-
-            cap_type = "other"
-            if "electrolytic" in desc_clean:
-                cap_type = "electrolytic"
-            elif "ceramic" in desc_clean or "mlcc" in desc_clean:
-                cap_type = "ceramic"
-            elif "film" in desc_clean:
-                cap_type = "film"
-            elif "tantalum" in desc_clean:
-                cap_type = "electrolytic"  # Treat tantalum as electrolytic for inventory purposes
-
-            if cap_type in capacitor_inv:
-                # Convert BOM value to Euro-style notation to match inventory
-                cap_value = convert_to_euro_notation(value.strip().lower())
-                status = capacitor_inv.get(cap_type, {}).get(cap_value)
-                print(f"🔎 Checking {cap_type} capacitor '{cap_value}' (from '{value.strip().lower()}') ... status: {status}")
-                
-                if status is None:
-                    highlight = pink_fill
-                    print(f"    -> Marking as missing (status is None)")
-                elif status == "few":
-                    highlight = orange_fill
-                    print(f"    -> Marking as few (status is 'few')")
-                else:
-                    print(f"    -> Available (status is '{status}')")
+                logger.debug("    -> Marking as few (status is 'few')")
+                return ORANGE_FILL
             else:
-                highlight = pink_fill
-                print(f"🔎 Unknown capacitor type '{cap_type}' for '{desc_clean}' -> marking as missing")
+                logger.debug("    -> Available (status is '%s')", status)
+        else:
+            logger.debug("🔎 Unknown capacitor type '%s' for '%s' -> marking as missing", cap_type, desc_clean)
+            return PINK_FILL
 
-        if highlight:
-            for col in range(1, ws.max_column + 1):
-                ws.cell(row=row, column=col).fill = highlight
+    return None
+
+def write_bom_sheet(wb: openpyxl.Workbook, sheet_name: str, df: pd.DataFrame, resistor_inv: Optional[Dict[str, str]] = None, capacitor_inv: Optional[Dict[Tuple[str, str], Optional[str]]] = None) -> None:
+    """
+    Append a BOM DataFrame as a new sheet of a write-only workbook.
+
+    Column widths must be set before rows are appended in write-only mode,
+    so widths come from the DataFrame. When inventory dicts are given,
+    missing/low-stock fills are attached as rows are emitted, which removes
+    the need to reopen the file for styling.
+    """
+    ws = wb.create_sheet(title=sheet_name)
+    autofit_column_widths(ws, df)
+    ws.append(list(df.columns))
+
+    check_inventory = resistor_inv is not None and capacitor_inv is not None
+    value_idx = df.columns.get_loc("Value")
+    desc_idx = df.columns.get_loc("Description")
+
+    for row in df.itertuples(index=False, name=None):
+        row = tuple(None if pd.isna(v) else v for v in row)
+        fill = None
+        if check_inventory:
+            fill = get_missing_part_fill(row[value_idx], row[desc_idx], resistor_inv, capacitor_inv)
+        if fill is None:
+            ws.append(row)
+        else:
+            cells = []
+            for v in row:
+                cell = WriteOnlyCell(ws, value=v)
+                cell.fill = fill
+                cells.append(cell)
+            ws.append(cells)
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Merge Aion FX BOMs into one Excel file.")
     parser.add_argument('--in', nargs='+', dest='input_files', required=True, help='Input BOM .xlsx files')
     parser.add_argument('--out', required=True, help='Output Excel filename')
     parser.add_argument('--inventory', help='Inventory XLSX file with resistor list (optional)')
+    parser.add_argument('--verbose', action='store_true', help='Print inventory lookup details')
 
     args = parser.parse_args()
     input_files = args.input_files
     output_file = args.out
     inventory_file = args.inventory
 
+    logging.basicConfig(format="%(message)s",
+                        level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    resistor_inventory = None
+    capacitor_inventory = None
+    if inventory_file:
+        # One shared read-only workbook open instead of one per loader
+        with pd.ExcelFile(inventory_file, engine="openpyxl",
+                          engine_kwargs={"read_only": True}) as inventory_xl:
+            resistor_inventory = load_resistor_inventory_from_xlsx(inventory_xl)
+            capacitor_inventory = load_capacitor_inventory_from_xlsx(inventory_xl)
+
     valid_sheets = []
-    combined_all = pd.DataFrame()
-
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        for file_path in input_files:
-            aion_fx_name = get_aion_fx_name(file_path)
-            bom_df = process_bom_file(file_path)
-            if bom_df is not None:
-                bom_df.to_excel(writer, sheet_name=aion_fx_name[:31], index=False)
-                valid_sheets.append(aion_fx_name[:31])
-
-                df_for_combined = bom_df.copy()
-                df_for_combined = df_for_combined[["Type", "Part", "Value", "Description"]]
-                df_for_combined["Count"] = df_for_combined["Part"].apply(count_parts_in_row)
-                df_for_combined = df_for_combined[["Type", "Value", "Description", "Count"]]
-                combined_all = pd.concat([combined_all, df_for_combined], ignore_index=True)
-            else:
-                print(f"⚠️ Skipped: {file_path}")
-
-        if not valid_sheets:
-            print("❌ No valid sheets were created. Exiting without writing file.")
-            return
-
-        if not combined_all.empty:
-            combined_grouped = (
-                combined_all.groupby(["Type", "Value", "Description"], dropna=False)
-                .agg({"Count": "sum"})
-                .reset_index()
-            )
-            combined_grouped = combined_grouped[["Type", "Count", "Value", "Description"]]
-            combined_sorted = sort_combined_bom(combined_grouped)
-            combined_sorted.to_excel(writer, sheet_name="Combined", index=False)
-            valid_sheets.append("Combined")
-
-    wb = openpyxl.load_workbook(output_file)
-    for sheet_name in valid_sheets:
-        ws = wb[sheet_name]
-        autofit_column_widths(ws)
-
-        if sheet_name == "Combined" and inventory_file:
-            resistor_inventory = load_resistor_inventory_from_xlsx(inventory_file)
-            capacitor_inventory = load_capacitor_inventory_from_xlsx(inventory_file)
-            highlight_missing_parts(ws, resistor_inventory, capacitor_inventory)
+    combined_frames = []
+
+    # Write-only mode streams rows straight to disk, so widths and inventory
+    # fills are applied while writing and the file is never reopened.
+    wb = openpyxl.Workbook(write_only=True)
+    for file_path in input_files:
+        aion_fx_name = get_aion_fx_name(file_path)
+        bom_df = process_bom_file(file_path)
+        if bom_df is not None:
+            write_bom_sheet(wb, aion_fx_name[:31], bom_df)
+            valid_sheets.append(aion_fx_name[:31])
+
+            df_for_combined = bom_df.copy()
+            df_for_combined = df_for_combined[["Type", "Part", "Value", "Description"]]
+            parts = df_for_combined["Part"].fillna("").astype(str)
+            df_for_combined["Count"] = np.where(parts.str.strip().eq(""), 0, parts.str.count(",") + 1)
+            df_for_combined = df_for_combined[["Type", "Value", "Description", "Count"]]
+            combined_frames.append(df_for_combined)
+        else:
+            print(f"⚠️ Skipped: {file_path}")
+
+    if not valid_sheets:
+        print("❌ No valid sheets were created. Exiting without writing file.")
+        return
+
+    combined_all = pd.concat(combined_frames, ignore_index=True) if combined_frames else pd.DataFrame()
+    if not combined_all.empty:
+        combined_grouped = (
+            combined_all.groupby(["Type", "Value", "Description"], dropna=False,
+                                 observed=True, sort=False)
+            .agg({"Count": "sum"})
+            .reset_index()
+        )
+        combined_grouped = combined_grouped[["Type", "Count", "Value", "Description"]]
+        combined_sorted = sort_combined_bom(combined_grouped)
+        write_bom_sheet(wb, "Combined", combined_sorted, resistor_inventory, capacitor_inventory)
+        valid_sheets.append("Combined")
 
     wb.save(output_file)
     print(f"✅ Output written to {output_file}")
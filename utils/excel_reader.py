@@ -1,38 +1,111 @@
+import logging
+import openpyxl
 import pandas as pd
-from typing import List
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
 
 
 AION_COLUMNS: List[str] = ["Part", "Value", "Description", "Notes"]
 
+# Alternate header spellings some BOM sheets use, normalized at ingest so
+# downstream code never branches on column naming
+COLUMN_ALIASES = {"Link URL (non-Mouser)": "Notes"}
+
+# Read-only worksheets trust the file's dimension metadata, which some
+# generators write incorrectly. A parse past this many rows is assumed bogus.
+MAX_REASONABLE_ROWS = 100_000
+
+
+def _sheet_to_dataframe(ws) -> Optional[pd.DataFrame]:
+    """
+    Materialize a worksheet into a DataFrame with one values-only row scan.
+
+    Returns None for sheets with no data rows, so empty stub sheets are
+    skipped without paying for a pandas parse.
+    """
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return None
+    # Without dimension metadata, read-only mode yields ragged rows (trailing
+    # empty cells omitted); pad/truncate to the header length like pandas'
+    # own openpyxl reader does
+    ncols = len(header)
+    data = []
+    for row in rows:
+        if len(row) < ncols:
+            row = row + (None,) * (ncols - len(row))
+        elif len(row) > ncols:
+            row = row[:ncols]
+        data.append(row)
+    if not data:
+        return None
+    if len(data) > MAX_REASONABLE_ROWS:
+        raise ValueError(f"Suspicious row count ({len(data)}) in sheet '{ws.title}'")
+    return pd.DataFrame(data, columns=list(header))
+
+
+def iter_aion_fx_sheets(file_path: str) -> Iterator[pd.DataFrame]:
+    """
+    Yield one DataFrame per relevant sheet of an Aion FX Excel file.
+
+    Only a single sheet is materialized at a time, so callers can filter
+    each batch before deciding what to keep — peak memory then tracks the
+    surviving rows rather than the whole workbook.
+    """
+    # Read-only mode streams rows instead of materializing the full workbook
+    # (styles, formulas) in memory, which keeps workbook-open cost near constant.
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+
+    # Process all sheets except the first one (Instructions) and any combined sheets
+    # Look for sheets that contain parts data
+    fallback_xl = None
+    try:
+        for ws in wb.worksheets:
+            title = ws.title
+            if "instruction" in title.lower() or "combined" in title.lower():
+                continue
+            try:
+                df = _sheet_to_dataframe(ws)
+            except Exception:
+                # Broken dimension metadata can derail read-only parsing; retry
+                # with a full (non-streaming) workbook load.
+                logger.warning("Read-only parse failed for sheet '%s' of %s; "
+                               "falling back to a full workbook load", title, file_path)
+                if fallback_xl is None:
+                    fallback_xl = pd.ExcelFile(file_path, engine="openpyxl")
+                df = fallback_xl.parse(title)
+            if df is None:
+                continue
+            # Only rename when the canonical column is absent — a sheet with
+            # both "Notes" and an alias would otherwise end up with two
+            # "Notes" columns and break downstream column access
+            rename_map = {col: COLUMN_ALIASES[col] for col in df.columns
+                          if col in COLUMN_ALIASES and COLUMN_ALIASES[col] not in df.columns}
+            if rename_map:
+                df = df.rename(columns=rename_map)
+            # .loc column selection stays a view under copy-on-write instead
+            # of copying every selected column per sheet
+            yield df.loc[:, AION_COLUMNS]
+    finally:
+        wb.close()
+
 
 def read_aion_fx_xlsx_file(file_path: str) -> pd.DataFrame:
     """
     Read an Aion FX Excel file and extract all relevant sheets into a combined DataFrame.
-    
+
     Args:
         file_path: Path to the Excel file
-        
+
     Returns:
         Combined DataFrame with all relevant sheets
     """
-    xl = pd.ExcelFile(file_path)
-    sheet_names = xl.sheet_names
+    frames = list(iter_aion_fx_sheets(file_path))
+    if not frames:
+        return pd.DataFrame(columns=AION_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
 
-    # Process all sheets except the first one (Instructions) and any combined sheets
-    # Look for sheets that contain parts data
-    relevant_sheets = []
-    for sheet in sheet_names:
-        if "instruction" not in sheet.lower() and "combined" not in sheet.lower():
-            relevant_sheets.append(sheet)
-    
-    combined_df = pd.DataFrame()
-
-    for sheet in relevant_sheets:
-        df = xl.parse(sheet)
-        df = df[AION_COLUMNS]
-        combined_df = pd.concat([combined_df, df], ignore_index=True)
-    
-    return combined_df
-
-
-# def read_aion_fx_url(url: str) -> pd.DataFrame:
\ No newline at end of file
+
+# def read_aion_fx_url(url: str) -> pd.DataFrame: